@@ -1,12 +1,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import sqlite3
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from numba import njit
+import polars as pl
+import duckdb
+from tsdownsample import MinMaxLTTBDownsampler
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -35,26 +34,257 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-    
-#return demographics, financial_services
-demographics=pd.read_csv("demographics.csv")
-financial_services=pd.read_csv("financial_services.csv")    
+
+# The five 0/1 service-flag columns, in dashboard display order
+SERVICE_COLS = ['has_bank_account', 'uses_mobile_money', 'has_savings',
+                'has_loan', 'uses_insurance']
 
 @st.cache_data
-def prepare_analysis_data():
-    """Prepare merged dataset for analysis"""
-    df = demographics.merge(financial_services, on='respondent_id', how='inner')
-    
-    # Create derived variables
-    df['any_formal_service'] = (
-        (df['has_bank_account'] == 1) | 
-        (df['uses_mobile_money'] == 1) | 
-        (df['has_savings'] == 1)
+def load_raw():
+    """Load the survey Parquet files once and memoize them across reruns
+
+    Only the columns the dashboard actually uses are read; Parquet prunes
+    the rest at IO time. Regenerate the files with `python to_parquet.py`.
+    """
+    demographics = pd.read_parquet(
+        "demographics.parquet",
+        columns=['respondent_id', 'province', 'urban_rural', 'education',
+                 'age', 'monthly_income_rwf']
     )
-    df['income_quintile'] = pd.qcut(df['monthly_income_rwf'], q=5, labels=['Q1', 'Q2', 'Q3', 'Q4', 'Q5'])
-    
+    financial_services = pd.read_parquet(
+        "financial_services.parquet",
+        columns=['respondent_id', 'has_bank_account', 'uses_mobile_money',
+                 'has_savings', 'has_loan', 'uses_insurance',
+                 'financial_literacy_score']
+    )
+    # Downcast: 0/1 flags to int8 and repeated strings to category, so
+    # every downstream mean/sum/groupby works on compact dictionary-encoded
+    # data instead of int64 columns and Python objects
+    for col in ('has_bank_account', 'uses_mobile_money', 'has_savings',
+                'has_loan', 'uses_insurance'):
+        financial_services[col] = financial_services[col].astype('int8')
+    for col in ('province', 'urban_rural', 'education'):
+        demographics[col] = demographics[col].astype('category')
+    return demographics, financial_services
+
+@st.cache_data
+def prepare_analysis_data(demographics, financial_services):
+    """Prepare the fully derived analysis dataset from the raw frames
+
+    All derived columns are computed here once, so the page handlers are
+    pure readers and never rebuild them on a rerun.
+    """
+    df = demographics.merge(financial_services, on='respondent_id', how='inner')
+
+    # Create derived variables; one pass over an int8 block instead of
+    # chained boolean Series ORs (no intermediate allocations)
+    formal_cols = df[['has_bank_account', 'uses_mobile_money', 'has_savings']].to_numpy(
+        dtype=np.int8, copy=False)
+    df['any_formal_service'] = formal_cols.any(axis=1)
+    df['service_count'] = df[SERVICE_COLS].to_numpy(
+        dtype=np.int8, copy=False).sum(axis=1).astype(np.int8)
+    # Bin income and age by searchsorted against precomputed edges rather
+    # than pd.qcut/pd.cut; side='left' keeps the same right-closed bins
+    income = df['monthly_income_rwf'].to_numpy()
+    quintile_edges = np.quantile(income, [0.2, 0.4, 0.6, 0.8])
+    df['income_quintile'] = pd.Categorical.from_codes(
+        np.searchsorted(quintile_edges, income),
+        ['Q1', 'Q2', 'Q3', 'Q4', 'Q5'], ordered=True)
+    df['age_group'] = pd.Categorical.from_codes(
+        np.searchsorted([25, 35, 45, 55], df['age'].to_numpy()),
+        ['18-25', '26-35', '36-45', '46-55', '56+'], ordered=True)
+
     return df
 
+def _urban_rural_mask(df, value):
+    """Boolean mask for urban_rural == value, compared on category codes
+
+    A single int8 equality over contiguous codes instead of per-row
+    string comparison.
+    """
+    col = df['urban_rural']
+    code = col.cat.categories.get_loc(value)
+    return col.cat.codes.to_numpy() == code
+
+@st.cache_data
+def filtered_frame(provinces, urban):
+    """Return the analysis frame restricted to the current filter state
+
+    Keyed on hashable filter values rather than the DataFrame itself, so
+    revisiting a filter combination is a cache hit. Page handlers must
+    treat the result as read-only: every derived column belongs in
+    prepare_analysis_data, never assigned per rerun on this frame.
+    """
+    demographics, financial_services = load_raw()
+    df = prepare_analysis_data(demographics, financial_services)
+    # Combine both filters into one mask so only a single copy is made
+    mask = df['province'].isin(provinces).to_numpy()
+    if urban != 'All':
+        mask = mask & _urban_rural_mask(df, urban)
+    return df[mask]
+
+@st.cache_resource
+def group_means_kernel():
+    """Compile (once) a jitted kernel computing per-group sums and counts"""
+    @njit(cache=True)
+    def kernel(codes, vals, n_groups):
+        sums = np.zeros((n_groups, vals.shape[1]))
+        counts = np.zeros(n_groups, np.int64)
+        for i in range(codes.shape[0]):
+            c = codes[i]
+            if c >= 0:
+                counts[c] += 1
+                for j in range(vals.shape[1]):
+                    sums[c, j] += vals[i, j]
+        return sums, counts
+    return kernel
+
+def _group_means(df, key, value_cols):
+    """Mean of value_cols per category of a categorical key column
+
+    Equivalent to df.groupby(key)[value_cols].mean().reset_index(), but
+    runs the jitted kernel over the raw category codes and a float64
+    value matrix — one pass, no pandas groupby machinery.
+    """
+    codes = df[key].cat.codes.to_numpy()
+    categories = df[key].cat.categories
+    vals = df[value_cols].to_numpy(dtype=np.float64)
+    sums, counts = group_means_kernel()(codes, vals, len(categories))
+    observed = counts > 0
+    means = sums[observed] / counts[observed][:, None]
+    out = pd.DataFrame({key: categories[observed]})
+    for j, col in enumerate(value_cols):
+        out[col] = means[:, j]
+    return out
+
+def downsample_xy(x, y, n_out=500):
+    """Reduce a line/scatter series to ~n_out shape-preserving points
+
+    No-op for short series; guards Plotly construction and rendering
+    cost should a chart ever be fed per-respondent data instead of the
+    small aggregates used today.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if y.shape[0] <= 1000:
+        return x, y
+    idx = MinMaxLTTBDownsampler().downsample(y, n_out=n_out)
+    return np.asarray(x)[idx], y[idx]
+
+@st.cache_resource
+def polars_frame():
+    """Polars copy of the analysis frame for multi-threaded aggregations"""
+    demographics, financial_services = load_raw()
+    return pl.from_pandas(prepare_analysis_data(demographics, financial_services))
+
+@st.cache_data
+def segment_stats(provinces, urban):
+    """Size and characteristics of the four bank/mobile segments
+
+    Runs as one lazy Polars plan (filter, segment encoding, grouped
+    aggregates fused into a single multi-threaded pass); only the tiny
+    result frame comes back to pandas for display.
+    """
+    lf = polars_frame().lazy().filter(pl.col('province').is_in(list(provinces)))
+    if urban != 'All':
+        lf = lf.filter(pl.col('urban_rural') == urban)
+    seg = (pl.col('has_bank_account').cast(pl.Int8) * 2 +
+           pl.col('uses_mobile_money').cast(pl.Int8)).alias('segment_code')
+    return (
+        lf.group_by(seg)
+        .agg(
+            pl.len().alias('size'),
+            pl.col('monthly_income_rwf').mean().alias('avg_income'),
+            (pl.col('urban_rural') == 'Urban').mean().alias('urban_share'),
+            pl.col('financial_literacy_score').mean().alias('avg_literacy')
+        )
+        .collect()
+        .to_pandas()
+        .set_index('segment_code')
+    )
+
+@st.cache_data
+def precomputed_kpis(provinces, urban):
+    """Scalar KPIs shared by the overview and policy pages
+
+    Each underlying column is scanned once here; the pages read plain
+    numbers from the cached dict instead of repeating the scans.
+    """
+    df = filtered_frame(provinces, urban)
+    rates = df[SERVICE_COLS].to_numpy(dtype=np.int8, copy=False).mean(axis=0)
+    formal = df['any_formal_service'].to_numpy()
+    rural_mask = _urban_rural_mask(df, 'Rural')
+    return {
+        'formal_inclusion': float(formal.mean()),
+        'bank_rate': float(rates[0]),
+        'mobile_rate': float(rates[1]),
+        'mobile_advantage': float(rates[1] - rates[0]),
+        'avg_literacy': float(df['financial_literacy_score'].mean()),
+        'excluded_count': int((~formal).sum()),
+        'rural_excluded_count': int((rural_mask & ~formal).sum()),
+        'low_literacy_count': int((df['financial_literacy_score'].to_numpy() < 5).sum()),
+        'non_mobile_count': int((df['uses_mobile_money'].to_numpy() == 0).sum()),
+        'urban_inclusion': float(formal[~rural_mask].mean()) if (~rural_mask).any() else float('nan'),
+        'rural_inclusion': float(formal[rural_mask].mean()) if rural_mask.any() else float('nan')
+    }
+
+@st.cache_data
+def urban_rural_stats(provinces, urban):
+    df = filtered_frame(provinces, urban)
+    return _group_means(df, 'urban_rural',
+                        ['has_bank_account', 'uses_mobile_money', 'any_formal_service'])
+
+@st.cache_data
+def edu_analysis(provinces, urban):
+    df = filtered_frame(provinces, urban)
+    return _group_means(df, 'education',
+                        ['any_formal_service', 'financial_literacy_score', 'monthly_income_rwf'])
+
+@st.cache_data
+def age_analysis(provinces, urban):
+    df = filtered_frame(provinces, urban)
+    return _group_means(df, 'age_group', ['uses_mobile_money', 'has_bank_account'])
+
+@st.cache_resource
+def duckdb_con():
+    """DuckDB connection with the joined survey data registered as a view
+
+    The engine scans the Parquet files directly with projection and
+    predicate pushdown and runs its group-bys as a parallel hash
+    aggregate, so queries skip the pandas merge entirely.
+    """
+    con = duckdb.connect()
+    con.execute("""
+        CREATE VIEW survey AS
+        SELECT d.*, f.* EXCLUDE (respondent_id),
+               (f.has_bank_account = 1 OR f.uses_mobile_money = 1
+                OR f.has_savings = 1) AS any_formal_service
+        FROM read_parquet('demographics.parquet') d
+        JOIN read_parquet('financial_services.parquet') f USING (respondent_id)
+    """)
+    return con
+
+@st.cache_data
+def province_stats(provinces, urban):
+    return duckdb_con().execute("""
+        SELECT province,
+               avg(any_formal_service::INT) AS any_formal_service,
+               avg(uses_mobile_money) AS uses_mobile_money,
+               avg(has_bank_account) AS has_bank_account,
+               avg(monthly_income_rwf) AS monthly_income_rwf,
+               avg(financial_literacy_score) AS financial_literacy_score
+        FROM survey
+        WHERE province IN (SELECT unnest(?))
+          AND (? = 'All' OR urban_rural = ?)
+        GROUP BY province
+        ORDER BY any_formal_service
+    """, [list(provinces), urban, urban]).df()
+
+@st.cache_data
+def income_service_stats(provinces, urban):
+    df = filtered_frame(provinces, urban)
+    return _group_means(df, 'income_quintile',
+                        ['has_bank_account', 'uses_mobile_money', 'has_savings', 'service_count'])
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">Rwanda Financial Inclusion Analysis</h1>', unsafe_allow_html=True)
@@ -62,7 +292,8 @@ def main():
     st.markdown("---")
     
     # Load data
-    df = prepare_analysis_data()
+    demographics, financial_services = load_raw()
+    df = prepare_analysis_data(demographics, financial_services)
     
     # Sidebar for controls
     st.sidebar.header("Dashboard Controls")
@@ -96,307 +327,301 @@ def main():
     """)
 
     
-    # Apply filters
-    filtered_df = df[df['province'].isin(selected_provinces)]
-    if urban_rural_filter != 'All':
-        filtered_df = filtered_df[filtered_df['urban_rural'] == urban_rural_filter]
-    
+    # Apply filters; the hashable key lets page aggregations cache per filter state
+    filter_key = (tuple(sorted(selected_provinces)), urban_rural_filter)
+    filtered_df = filtered_frame(*filter_key)
+
     # Main dashboard content
     if analysis_type == "Executive Overview":
-        show_executive_overview(filtered_df)
+        show_executive_overview(filtered_df, filter_key)
     elif analysis_type == "Demographic Analysis":
-        show_demographic_analysis(filtered_df)
+        show_demographic_analysis(filtered_df, filter_key)
     elif analysis_type == "Provincial Analysis":
-        show_provincial_analysis(filtered_df)
+        show_provincial_analysis(filtered_df, filter_key)
     elif analysis_type == "Service Usage":
-        show_service_usage(filtered_df)
+        show_service_usage(filtered_df, filter_key)
     elif analysis_type == "Market Segments":
-        show_market_segments(filtered_df)
+        show_market_segments(filtered_df, filter_key)
     elif analysis_type == "Policy Insights":
-        show_policy_insights(filtered_df)
+        show_policy_insights(filtered_df, filter_key)
 
-def show_executive_overview(df):
+@st.cache_data
+def overview_figs(provinces, urban):
+    """Build the executive-overview figures once per filter state"""
+    df = filtered_frame(provinces, urban)
+
+    # Service adoption rates (fused rate vector, one pass)
+    rates = df[SERVICE_COLS].to_numpy(dtype=np.int8, copy=False).mean(axis=0)
+    services = ['Bank Account', 'Mobile Money', 'Savings', 'Loans', 'Insurance']
+    adoption_fig = go.Figure(go.Bar(
+        x=services,
+        y=rates,
+        texttemplate='%{y:.1%}',
+        textposition='outside'
+    ))
+    adoption_fig.update_layout(
+        title="Financial Service Adoption Rates",
+        xaxis_title='Service Type',
+        yaxis_title='Adoption Rate',
+        showlegend=False
+    )
+
+    # Urban vs Rural comparison
+    comparison_data = urban_rural_stats(provinces, urban)
+    comparison_fig = go.Figure([
+        go.Bar(x=comparison_data['urban_rural'], y=comparison_data[col], name=col)
+        for col in ('has_bank_account', 'uses_mobile_money', 'any_formal_service')
+    ])
+    comparison_fig.update_layout(
+        title="Urban vs Rural Financial Inclusion",
+        barmode='group'
+    )
+    return adoption_fig, comparison_fig
+
+def show_executive_overview(df, filter_key):
     st.header("Executive Overview")
-    
+
+    kpis = precomputed_kpis(*filter_key)
+
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
-        formal_inclusion = df['any_formal_service'].mean()
         st.metric(
-            "Formal Financial Inclusion", 
-            f"{formal_inclusion:.1%}",
+            "Formal Financial Inclusion",
+            f"{kpis['formal_inclusion']:.1%}",
             delta=f"Target: 75%"
         )
-    
+
     with col2:
-        mobile_money = df['uses_mobile_money'].mean()
         st.metric(
-            "Mobile Money Usage", 
-            f"{mobile_money:.1%}",
-            delta=f"vs Banking: +{(mobile_money - df['has_bank_account'].mean()):.1%}"
+            "Mobile Money Usage",
+            f"{kpis['mobile_rate']:.1%}",
+            delta=f"vs Banking: +{kpis['mobile_advantage']:.1%}"
         )
-    
+
     with col3:
-        avg_literacy = df['financial_literacy_score'].mean()
         st.metric(
-            "Avg Financial Literacy", 
-            f"{avg_literacy:.1f}/10",
+            "Avg Financial Literacy",
+            f"{kpis['avg_literacy']:.1f}/10",
             delta="Target: 8.0"
         )
-    
+
     with col4:
-        excluded_count = len(df[df['any_formal_service'] == False])
         st.metric(
-            "Financially Excluded", 
-            f"{excluded_count:,}",
-            delta=f"{excluded_count/len(df):.1%} of population"
+            "Financially Excluded",
+            f"{kpis['excluded_count']:,}",
+            delta=f"{kpis['excluded_count']/len(df):.1%} of population"
         )
     
-    # Main visualizations
+    # Main visualizations (figures are cached per filter state)
+    adoption_fig, comparison_fig = overview_figs(*filter_key)
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        # Service adoption rates
-        services = ['Bank Account', 'Mobile Money', 'Savings', 'Loans', 'Insurance']
-        rates = [
-            df['has_bank_account'].mean(),
-            df['uses_mobile_money'].mean(),
-            df['has_savings'].mean(),
-            df['has_loan'].mean(),
-            df['uses_insurance'].mean()
-        ]
-        
-        fig = px.bar(
-            x=services, 
-            y=rates,
-            title="Financial Service Adoption Rates",
-            labels={'x': 'Service Type', 'y': 'Adoption Rate'}
-        )
-        fig.update_traces(texttemplate='%{y:.1%}', textposition='outside')
-        fig.update_layout(showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
-    
+        st.plotly_chart(adoption_fig, use_container_width=True)
+
     with col2:
-        # Urban vs Rural comparison
-        comparison_data = df.groupby('urban_rural').agg({
-            'has_bank_account': 'mean',
-            'uses_mobile_money': 'mean',
-            'any_formal_service': 'mean'
-        }).reset_index()
-        
-        fig = px.bar(
-            comparison_data,
-            x='urban_rural',
-            y=['has_bank_account', 'uses_mobile_money', 'any_formal_service'],
-            title="Urban vs Rural Financial Inclusion",
-            barmode='group'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(comparison_fig, use_container_width=True)
 
-def show_demographic_analysis(df):
-    st.header("👥 Demographic Analysis")
-    
-    # Analysis by education
-    st.subheader("Financial Inclusion by Education Level")
-    edu_analysis = df.groupby('education').agg({
-        'any_formal_service': 'mean',
-        'financial_literacy_score': 'mean',
-        'monthly_income_rwf': 'mean'
-    }).reset_index()
-    
-    fig = make_subplots(
+@st.cache_data
+def demographic_figs(provinces, urban):
+    """Build the demographic-analysis figures once per filter state"""
+    # Deferred: only this page needs the subplot machinery
+    from plotly.subplots import make_subplots
+
+    edu_stats = edu_analysis(provinces, urban)
+
+    edu_fig = make_subplots(
         rows=1, cols=3,
         subplot_titles=('Inclusion Rate', 'Financial Literacy', 'Average Income')
     )
-    
-    fig.add_trace(
-        go.Bar(x=edu_analysis['education'], y=edu_analysis['any_formal_service'], name='Inclusion Rate'),
+
+    edu_fig.add_trace(
+        go.Bar(x=edu_stats['education'], y=edu_stats['any_formal_service'], name='Inclusion Rate'),
         row=1, col=1
     )
-    
-    fig.add_trace(
-        go.Bar(x=edu_analysis['education'], y=edu_analysis['financial_literacy_score'], name='Literacy Score'),
+
+    edu_fig.add_trace(
+        go.Bar(x=edu_stats['education'], y=edu_stats['financial_literacy_score'], name='Literacy Score'),
         row=1, col=2
     )
-    
-    fig.add_trace(
-        go.Bar(x=edu_analysis['education'], y=edu_analysis['monthly_income_rwf'], name='Income (RWF)'),
+
+    edu_fig.add_trace(
+        go.Bar(x=edu_stats['education'], y=edu_stats['monthly_income_rwf'], name='Income (RWF)'),
         row=1, col=3
     )
-    
-    fig.update_layout(showlegend=False, height=400)
-    st.plotly_chart(fig, use_container_width=True)
-    
+
+    edu_fig.update_layout(showlegend=False, height=400)
+
+    age_stats = age_analysis(provinces, urban)
+    age_fig = go.Figure()
+    for col in ('uses_mobile_money', 'has_bank_account'):
+        xs, ys = downsample_xy(age_stats['age_group'], age_stats[col])
+        age_fig.add_trace(go.Scatter(x=xs, y=ys, mode='lines+markers', name=col))
+    age_fig.update_layout(title="Service Adoption by Age Group")
+    return edu_fig, age_fig
+
+def show_demographic_analysis(df, filter_key):
+    st.header("👥 Demographic Analysis")
+
+    edu_fig, age_fig = demographic_figs(*filter_key)
+
+    # Analysis by education
+    st.subheader("Financial Inclusion by Education Level")
+    st.plotly_chart(edu_fig, use_container_width=True)
+
     # Age analysis
     st.subheader("Financial Services by Age Group")
-    df['age_group'] = pd.cut(df['age'], bins=[0, 25, 35, 45, 55, 100], 
-                           labels=['18-25', '26-35', '36-45', '46-55', '56+'])
-    
-    age_analysis = df.groupby('age_group').agg({
-        'uses_mobile_money': 'mean',
-        'has_bank_account': 'mean'
-    }).reset_index()
-    
-    fig = px.line(
-        age_analysis,
-        x='age_group',
-        y=['uses_mobile_money', 'has_bank_account'],
-        title="Service Adoption by Age Group"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(age_fig, use_container_width=True)
 
-def show_provincial_analysis(df):
-    st.header("🗺️ Provincial Analysis")
-    
-    # Provincial comparison
-    province_stats = df.groupby('province').agg({
-        'any_formal_service': 'mean',
-        'uses_mobile_money': 'mean',
-        'has_bank_account': 'mean',
-        'monthly_income_rwf': 'mean',
-        'financial_literacy_score': 'mean'
-    }).reset_index()
-    
-    # Sort by inclusion rate
-    province_stats = province_stats.sort_values('any_formal_service', ascending=True)
-    
-    fig = px.bar(
-        province_stats,
-        x='any_formal_service',
-        y='province',
+@st.cache_data
+def province_fig(provinces, urban):
+    """Build the provincial-comparison bar chart once per filter state"""
+    prov_stats = province_stats(provinces, urban)
+    fig = go.Figure(go.Bar(
+        x=prov_stats['any_formal_service'],
+        y=prov_stats['province'],
         orientation='h',
-        title="Financial Inclusion Rate by Province",
-        text='any_formal_service'
-    )
-    fig.update_traces(texttemplate='%{text:.1%}', textposition='outside')
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # Detailed provincial table
+        texttemplate='%{x:.1%}',
+        textposition='outside'
+    ))
+    fig.update_layout(title="Financial Inclusion Rate by Province")
+    return fig
+
+def show_provincial_analysis(df, filter_key):
+    st.header("🗺️ Provincial Analysis")
+
+    # Provincial comparison, sorted by inclusion rate
+    prov_stats = province_stats(*filter_key)
+    st.plotly_chart(province_fig(*filter_key), use_container_width=True)
+
+    # Detailed provincial table; Styler formats lazily at render time
+    # instead of materializing five per-row string columns
     st.subheader("Detailed Provincial Statistics")
-    province_display = province_stats.copy()
-    province_display['any_formal_service'] = province_display['any_formal_service'].map('{:.1%}'.format)
-    province_display['uses_mobile_money'] = province_display['uses_mobile_money'].map('{:.1%}'.format)
-    province_display['has_bank_account'] = province_display['has_bank_account'].map('{:.1%}'.format)
-    province_display['monthly_income_rwf'] = province_display['monthly_income_rwf'].map('{:,.0f}'.format)
-    province_display['financial_literacy_score'] = province_display['financial_literacy_score'].map('{:.1f}'.format)
-    
-    province_display.columns = ['Province', 'Inclusion Rate', 'Mobile Money', 'Banking', 'Avg Income (RWF)', 'Literacy Score']
-    st.dataframe(province_display, use_container_width=True)
+    province_display = prov_stats.rename(columns={
+        'province': 'Province',
+        'any_formal_service': 'Inclusion Rate',
+        'uses_mobile_money': 'Mobile Money',
+        'has_bank_account': 'Banking',
+        'monthly_income_rwf': 'Avg Income (RWF)',
+        'financial_literacy_score': 'Literacy Score'
+    })
+    st.dataframe(
+        province_display.style.format({
+            'Inclusion Rate': '{:.1%}',
+            'Mobile Money': '{:.1%}',
+            'Banking': '{:.1%}',
+            'Avg Income (RWF)': '{:,.0f}',
+            'Literacy Score': '{:.1f}'
+        }),
+        use_container_width=True
+    )
+
+@st.cache_data
+def service_usage_figs(provinces, urban):
+    """Build the service-usage figures once per filter state"""
+    df = filtered_frame(provinces, urban)
 
-def show_service_usage(df):
-    st.header("💳 Financial Service Usage Patterns")
-    
     # Service combination analysis
-    df['service_count'] = (
-        df['has_bank_account'] + df['uses_mobile_money'] + 
-        df['has_savings'] + df['has_loan'] + df['uses_insurance']
-    )
-    
     service_dist = df['service_count'].value_counts().sort_index()
-    
-    fig = px.bar(
-        x=service_dist.index,
-        y=service_dist.values,
+    dist_fig = go.Figure(go.Bar(
+        x=service_dist.index.to_numpy(),
+        y=service_dist.to_numpy()
+    ))
+    dist_fig.update_layout(
         title="Distribution of Number of Services Used",
-        labels={'x': 'Number of Services', 'y': 'Number of People'}
+        xaxis_title='Number of Services',
+        yaxis_title='Number of People'
     )
-    st.plotly_chart(fig, use_container_width=True)
-    
+
     # Income vs service usage
+    income_service = income_service_stats(provinces, urban)
+    income_fig = go.Figure()
+    for col in ('has_bank_account', 'uses_mobile_money', 'has_savings'):
+        xs, ys = downsample_xy(income_service['income_quintile'], income_service[col])
+        income_fig.add_trace(go.Scatter(x=xs, y=ys, mode='lines+markers', name=col))
+    income_fig.update_layout(title="Service Adoption by Income Quintile")
+    return dist_fig, income_fig
+
+def show_service_usage(df, filter_key):
+    st.header("💳 Financial Service Usage Patterns")
+
+    dist_fig, income_fig = service_usage_figs(*filter_key)
+    st.plotly_chart(dist_fig, use_container_width=True)
+
     st.subheader("Service Usage by Income Level")
-    income_service = df.groupby('income_quintile').agg({
-        'has_bank_account': 'mean',
-        'uses_mobile_money': 'mean',
-        'has_savings': 'mean',
-        'service_count': 'mean'
-    }).reset_index()
-    
-    fig = px.line(
-        income_service,
-        x='income_quintile',
-        y=['has_bank_account', 'uses_mobile_money', 'has_savings'],
-        title="Service Adoption by Income Quintile"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(income_fig, use_container_width=True)
 
-def show_market_segments(df):
+# Segment codes: 0=excluded, 1=mobile-only, 2=bank-only, 3=digital champions
+SEGMENT_ORDER = [
+    (3, 'Digital Champions'),
+    (1, 'Mobile-Only Users'),
+    (2, 'Traditional Banking'),
+    (0, 'Financially Excluded')
+]
+
+@st.cache_data
+def segment_pie_fig(provinces, urban):
+    """Build the market-segmentation pie once per filter state"""
+    seg_stats = segment_stats(provinces, urban)
+    present = [(code, name) for code, name in SEGMENT_ORDER if code in seg_stats.index]
+    fig = go.Figure(go.Pie(
+        values=[int(seg_stats.loc[code, 'size']) for code, _ in present],
+        labels=[name for _, name in present]
+    ))
+    fig.update_layout(title="Market Segmentation")
+    return fig
+
+def show_market_segments(df, filter_key):
     st.header("Market Segmentation")
-    
-    # Define segments
-    segments = {}
-    
-    # Digital Champions (mobile + bank)
-    digital_champions = df[(df['uses_mobile_money'] == 1) & (df['has_bank_account'] == 1)]
-    segments['Digital Champions'] = len(digital_champions)
-    
-    # Mobile-only users
-    mobile_only = df[(df['uses_mobile_money'] == 1) & (df['has_bank_account'] == 0)]
-    segments['Mobile-Only Users'] = len(mobile_only)
-    
-    # Traditional banking only
-    bank_only = df[(df['has_bank_account'] == 1) & (df['uses_mobile_money'] == 0)]
-    segments['Traditional Banking'] = len(bank_only)
-    
-    # Financially excluded
-    excluded = df[(df['has_bank_account'] == 0) & (df['uses_mobile_money'] == 0)]
-    segments['Financially Excluded'] = len(excluded)
-    
+
+    # Sizes and characteristics come from one cached Polars pass
+    seg_stats = segment_stats(*filter_key)
+    present = [(code, name) for code, name in SEGMENT_ORDER if code in seg_stats.index]
+
     # Pie chart
-    fig = px.pie(
-        values=list(segments.values()),
-        names=list(segments.keys()),
-        title="Market Segmentation"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    
+    st.plotly_chart(segment_pie_fig(*filter_key), use_container_width=True)
+
     # Segment characteristics
     st.subheader("Segment Characteristics")
     segment_data = []
-    
-    for segment_name, segment_df in [
-        ('Digital Champions', digital_champions),
-        ('Mobile-Only Users', mobile_only),
-        ('Traditional Banking', bank_only),
-        ('Financially Excluded', excluded)
-    ]:
-        if len(segment_df) > 0:
-            segment_data.append({
-                'Segment': segment_name,
-                'Size': len(segment_df),
-                'Percentage': f"{len(segment_df)/len(df):.1%}",
-                'Avg Income': f"{segment_df['monthly_income_rwf'].mean():,.0f}",
-                'Urban %': f"{(segment_df['urban_rural'] == 'Urban').mean():.1%}",
-                'Avg Literacy': f"{segment_df['financial_literacy_score'].mean():.1f}"
-            })
-    
+    for code, segment_name in present:
+        stats = seg_stats.loc[code]
+        segment_data.append({
+            'Segment': segment_name,
+            'Size': int(stats['size']),
+            'Percentage': f"{stats['size']/len(df):.1%}",
+            'Avg Income': f"{stats['avg_income']:,.0f}",
+            'Urban %': f"{stats['urban_share']:.1%}",
+            'Avg Literacy': f"{stats['avg_literacy']:.1f}"
+        })
+
     st.dataframe(pd.DataFrame(segment_data), use_container_width=True)
 
-def show_policy_insights(df):
+def show_policy_insights(df, filter_key):
     st.header("Policy Insights & Recommendations")
     
     # Key findings
     st.subheader("Key Findings")
     
-    urban_inclusion = df[df['urban_rural'] == 'Urban']['any_formal_service'].mean()
-    rural_inclusion = df[df['urban_rural'] == 'Rural']['any_formal_service'].mean()
-    urban_rural_gap = urban_inclusion - rural_inclusion
-    
+    kpis = precomputed_kpis(*filter_key)
+    urban_rural_gap = kpis['urban_inclusion'] - kpis['rural_inclusion']
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.info(f"""
         **Urban-Rural Gap**: {urban_rural_gap:.1%}
-        
-        Urban areas show significantly higher financial inclusion rates. 
-        This represents approximately {len(df[(df['urban_rural'] == 'Rural') & (df['any_formal_service'] == False)]):,} 
+
+        Urban areas show significantly higher financial inclusion rates.
+        This represents approximately {kpis['rural_excluded_count']:,}
         excluded rural residents.
         """)
-    
+
     with col2:
-        mobile_advantage = df['uses_mobile_money'].mean() - df['has_bank_account'].mean()
         st.info(f"""
-        **Mobile Money Advantage**: +{mobile_advantage:.1%}
+        **Mobile Money Advantage**: +{kpis['mobile_advantage']:.1%}
         
         Mobile money adoption significantly exceeds traditional banking,
         suggesting digital-first strategies may be more effective.
@@ -410,21 +635,21 @@ def show_policy_insights(df):
             "title": "Rural Mobile Money Agent Expansion",
             "priority": "HIGH",
             "description": "Expand mobile money agent networks in rural areas to bridge the urban-rural inclusion gap.",
-            "target": f"{len(df[(df['urban_rural'] == 'Rural') & (df['any_formal_service'] == False)]):,} rural residents",
+            "target": f"{kpis['rural_excluded_count']:,} rural residents",
             "impact": "Could increase national inclusion by 8-12%"
         },
         {
             "title": "Financial Literacy Programs",
             "priority": "HIGH", 
             "description": "Implement targeted financial education for low-education demographics.",
-            "target": f"{len(df[df['financial_literacy_score'] < 5]):,} individuals with low financial literacy",
+            "target": f"{kpis['low_literacy_count']:,} individuals with low financial literacy",
             "impact": "Could improve literacy scores by 2-3 points"
         },
         {
             "title": "Digital-First Service Strategy",
             "priority": "MEDIUM",
             "description": "Prioritize mobile-based financial services over traditional banking infrastructure.",
-            "target": f"{len(df[df['uses_mobile_money'] == 0]):,} non-mobile money users",
+            "target": f"{kpis['non_mobile_count']:,} non-mobile money users",
             "impact": "More cost-effective reach than traditional banking"
         }
     ]
@@ -0,0 +1,56 @@
+"""One-time conversion of the survey CSVs to Parquet.
+
+Run once after updating the raw data:
+
+    python to_parquet.py
+
+The dashboard reads the Parquet files, which load much faster than CSV
+(columnar, binary, no type inference) and allow reading only the columns
+it actually uses.
+
+Conversion streams through PyArrow's chunked CSV reader and writes
+Parquet row groups incrementally, so peak memory stays O(block size)
+rather than O(file size) if the raw exports ever grow large. The 0/1
+service flags are typed int8 at read time, matching the dtypes the app
+wants downstream.
+"""
+import pyarrow as pa
+from pyarrow import csv, parquet as pq
+
+FLAG_TYPES = {col: pa.int8() for col in (
+    'has_bank_account', 'uses_mobile_money', 'has_savings',
+    'has_loan', 'uses_insurance', 'uses_digital_banking')}
+
+CONVERSIONS = [
+    ("demographics.csv", "demographics.parquet"),
+    ("financial_services.csv", "financial_services.parquet"),
+]
+
+BLOCK_SIZE = 8 << 20  # 8 MiB per streamed batch
+
+
+def convert(csv_path, parquet_path):
+    reader = csv.open_csv(
+        csv_path,
+        read_options=csv.ReadOptions(block_size=BLOCK_SIZE),
+        convert_options=csv.ConvertOptions(column_types=FLAG_TYPES),
+    )
+    writer = None
+    rows = 0
+    try:
+        for batch in reader:
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, batch.schema,
+                                          compression="snappy")
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    for csv_path, parquet_path in CONVERSIONS:
+        rows = convert(csv_path, parquet_path)
+        print(f"{csv_path} -> {parquet_path} ({rows:,} rows)")